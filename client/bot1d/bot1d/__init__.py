@@ -1,4 +1,10 @@
-from . import llmx
-from . import server
-from . import client
-from . import config
+import importlib
+
+# submodules are imported on first access, `import bot1d` alone should not pull in mcp/httpx
+__all__ = ['cache', 'llmx', 'server', 'prefetch', 'journal', 'client', 'config', 'startup']
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
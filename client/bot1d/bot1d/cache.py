@@ -0,0 +1,76 @@
+import os
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any
+
+
+def canonical_key(payload: dict[str, Any]) -> str:
+    """sha256 of the request payload(model, params and messages) in canonical json"""
+    text = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class CompletionCache:
+    """
+    LLM completions on local disk, one file per request key.
+    Least recently used entries are evicted once max_entries or max_bytes is exceeded.
+    File mtime is the last use time, so the LRU order survives restarts.
+    """
+    def __init__(self, cache_dir: str, max_entries: int, max_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> file size, least recently used first
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _load_index(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = [ent for ent in os.scandir(self.cache_dir) if ent.is_file() and not ent.name.endswith('.tmp')]
+        entries.sort(key=lambda ent: ent.stat().st_mtime)
+        for ent in entries:
+            size = ent.stat().st_size
+            self._index[ent.name] = size
+            self._total_bytes += size
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        if key not in self._index:
+            return None
+        try:
+            with open(self._path(key), 'r') as f:
+                entry = json.load(f)
+            os.utime(self._path(key))
+        except (OSError, json.JSONDecodeError) as err:
+            logging.warning(f'Dropping broken completion cache entry {key}, err: {str(err)}')
+            self._remove(key)
+            return None
+        self._index.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: dict[str, Any]) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data = json.dumps(entry, ensure_ascii=False).encode()
+        tmp_path = self._path(key) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        if key in self._index:
+            self._total_bytes -= self._index.pop(key)
+        self._index[key] = len(data)
+        self._total_bytes += len(data)
+        while self._index and (len(self._index) > self.max_entries or self._total_bytes > self.max_bytes):
+            self._remove(next(iter(self._index)))
+
+    def _remove(self, key: str) -> None:
+        self._total_bytes -= self._index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
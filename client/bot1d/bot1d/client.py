@@ -1,14 +1,22 @@
 import json
 import logging
-from typing import Any
+import secrets
+from typing import Any, TYPE_CHECKING
 import os
 
 from pydantic import BaseModel
-from mcp.types import CallToolResult
 
 from bot1d.llmx import LLMx
 from bot1d.server import Server
-from bot1d.config import format_tool_description, SHORT_MEMORY_DIR
+from bot1d.prefetch import Prefetcher, PREFETCH_ONLY_TOOLS
+from bot1d.journal import Journal, load_tail, load_recap, latest_conversation, load_output
+from bot1d.config import (format_tool_description, SHORT_MEMORY_DIR, TOOL_OUTPUT_MAX_BYTES, TURN_OUTPUT_MAX_BYTES,
+                          MIN_TOOL_OUTPUT_BYTES,
+                          PREFETCH_MAX_CALLS, JOURNAL_DIR, JOURNAL_COMPACT_EVERY, JOURNAL_KEEP_TOKENS,
+                          JOURNAL_MAX_CONVERSATIONS, RESUME_MAX_TOKENS)
+
+if TYPE_CHECKING:
+    from mcp.types import CallToolResult
 
 def export_env_from_file(file_path: str) -> dict[str, str]:
     """
@@ -33,16 +41,27 @@ def export_env_from_file(file_path: str) -> dict[str, str]:
         logging.error(f"Error loading environment variables: {e}")
         return {}
 
-logging.basicConfig(
-        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(filename)s - %(message)s"
-)
-
 
 class LLMTool(BaseModel):
     server: str
     tool: str
     arguments: dict[str, Any] | None
 
+# tools served by the client itself, not by any MCP server
+CLIENT_SERVER = 'bot1d'
+EXPAND_TOOL = dict(
+    name='expand',
+    description='Read more of a truncated tool output. Use the ref and offset given in the truncation marker.',
+    inputSchema={
+        'type': 'object',
+        'properties': {
+            'ref': {'description': 'output ref from the truncation marker'},
+            'offset': {'description': 'byte offset from the truncation marker'},
+        },
+        'required': ['ref', 'offset'],
+    },
+)
+
 class BotClient:
     """
     1. initialize the connection with servers
@@ -58,6 +77,15 @@ class BotClient:
         self.servers = {ser.name: ser for ser in servers}
         self.tools_description = ''
         self._initialized = False
+        # server name -> tool name -> param names, to know which tools take max_bytes
+        self._tool_params: dict[str, dict[str, set[str]]] = {}
+        # ref -> full text of truncated tool outputs, for the expand tool.
+        # refs carry a per session id, a resumed conversation keeps the refs of earlier sessions apart
+        self._tool_outputs: dict[str, str] = {}
+        self._session_id = secrets.token_hex(4)
+        self._output_count = 0
+        self.prefetcher = Prefetcher(self.servers, self._tool_params, PREFETCH_MAX_CALLS)
+        self.journal: Journal | None = None
         self._prompt2llm = (
                 "You are a helpful assistant with access to these extra tools:\n\n"
                 "{tools_description}\n"
@@ -82,6 +110,9 @@ class BotClient:
             )
     async def cleanup(self):
         try:
+            if self.journal:
+                self.journal.close()
+            await self.prefetcher.cleanup()
             await self.llm.cleanup()
             for server in self.servers.values():
                 await server.cleanup()
@@ -93,12 +124,83 @@ class BotClient:
         for server in self.servers.values():
             await server.initialize()
             tools = await server.list_tools()
-            descrip = format_tool_description(server.name, tools)
+            self._tool_params[server.name] = {
+                tool.name: set(tool.inputSchema.get('properties', {})) for tool in tools}
+            descrip = format_tool_description(
+                server.name, [tool for tool in tools if tool.name not in PREFETCH_ONLY_TOOLS])
             self.tools_description += descrip + '\n'
+        if self.tools_description:
+            from mcp.types import Tool
+            self.tools_description += format_tool_description(CLIENT_SERVER, [Tool(**EXPAND_TOOL)]) + '\n'
         self._prompt2llm = self._prompt2llm.format(
             tools_description=self.tools_description if self.tools_description else 'No Tool Available.')
         self._initialized = True
 
+    def _truncation_marker(self, ref: str, rest: int, offset: int) -> str:
+        return (f'...[truncated, {rest} more bytes. To read more, call server "{CLIENT_SERVER}" '
+                f'tool "{EXPAND_TOOL["name"]}" with ref "{ref}" and offset {offset}]')
+
+    def clip_tool_output(self, text: str, budget: int, offset: int = 0, ref: str | None = None) -> str:
+        """
+        Cut text to budget bytes starting from offset, truncation marker included.
+        If something is left, keep the full text under ref and end with a truncation marker.
+        """
+        data = text.encode()
+        if len(data) - offset <= budget:
+            return data[offset:].decode(errors='ignore')
+        if ref is None:
+            self._output_count += 1
+            ref = f'out-{self._session_id}-{self._output_count}'
+            self._tool_outputs[ref] = text
+            if self.journal:
+                self.journal.save_output(ref, text)
+        # the widest marker this output can get, its numbers are never longer than len(data)
+        marker_bytes = len(self._truncation_marker(ref, len(data), len(data)).encode())
+        clipped = data[offset:offset + max(budget - marker_bytes, 0)].decode(errors='ignore')
+        used = len(clipped.encode())
+        return clipped + self._truncation_marker(ref, len(data) - offset - used, offset + used)
+
+    @staticmethod
+    def skip_message(llm_tool: LLMTool) -> str:
+        return f'[skipped, tool output budget of this turn used up. Call {llm_tool.server}/{llm_tool.tool} next turn]'
+
+    async def call_llm_tool(self, llm_tool: LLMTool, budget: int) -> str:
+        """Run one tool call from LLM and clip its output to budget bytes."""
+        arguments = dict(llm_tool.arguments or {})
+        if budget < MIN_TOOL_OUTPUT_BYTES:
+            return self.skip_message(llm_tool)
+        if llm_tool.server == CLIENT_SERVER and llm_tool.tool == EXPAND_TOOL['name']:
+            ref = str(arguments.get('ref'))
+            if ref not in self._tool_outputs and self.journal:
+                # output of an earlier session of a resumed conversation
+                output = load_output(self.journal.journal_dir, ref)
+                if output is not None:
+                    self._tool_outputs[ref] = output
+            if ref not in self._tool_outputs:
+                return f'Unknown output ref {ref}, use the ref given in the truncation marker.'
+            try:
+                offset = int(arguments.get('offset', 0))
+            except (TypeError, ValueError):
+                return f'Invalid offset {arguments.get("offset")!r}, use the number given in the truncation marker.'
+            if not 0 <= offset < len(self._tool_outputs[ref].encode()):
+                return f'Offset {offset} is out of range for output ref {ref}.'
+            return self.clip_tool_output(self._tool_outputs[ref], budget, offset, ref)
+
+        if llm_tool.server not in self.servers:
+            raise ValueError(f'LLM requested an unknown server: {llm_tool.server}. Availables: {self.servers.keys()}')
+        # let the server trim its own output when it supports it, cheaper than cutting raw text here
+        if 'max_bytes' in self._tool_params[llm_tool.server].get(llm_tool.tool, ()):
+            arguments.setdefault('max_bytes', budget)
+        await self.prefetcher.claim(llm_tool.server, llm_tool.tool, arguments)
+        mcp_server = self.servers[llm_tool.server]
+        tool_rsp: CallToolResult = await mcp_server.call_tool(llm_tool.tool, arguments)
+        if tool_rsp is None:
+            return f'Tool {llm_tool.tool} failed, no output.'
+        text = '\n'.join(item.text for item in tool_rsp.content if item.type == 'text')
+        # runs in background while LLM answers with this output
+        self.prefetcher.schedule(llm_tool.server, llm_tool.tool, text)
+        return self.clip_tool_output(text, budget)
+
     async def handle_llm_response(self, rsp: str) -> str:
         try:
             rsp_json = json.loads(rsp)
@@ -111,13 +213,17 @@ class BotClient:
         results = {}
         if 'mcptools' in rsp_json:
             logging.info('Calling tools for more info...')
-            for tool in rsp_json['mcptools']:
-                llm_tool = LLMTool(**tool)
-                if llm_tool.server not in self.servers:
-                    raise ValueError(f'LLM requested an unknown server: {llm_tool.server}. Availables: {self.servers.keys()}')
-                mcp_server = self.servers[llm_tool.server]
-                tool_rsp: CallToolResult = await mcp_server.call_tool(llm_tool.tool, llm_tool.arguments)
-                results[llm_tool.server] = tool_rsp.content[0].text
+            turn_budget = TURN_OUTPUT_MAX_BYTES
+            self.prefetcher.new_turn()
+            llm_tools = [LLMTool(**tool) for tool in rsp_json['mcptools']]
+            # room for the skip message of every later call, so the turn stays within budget whatever happens
+            skip_bytes = [len(self.skip_message(llm_tool).encode()) for llm_tool in llm_tools]
+            for index, llm_tool in enumerate(llm_tools):
+                budget = min(TOOL_OUTPUT_MAX_BYTES, turn_budget - sum(skip_bytes[index + 1:]))
+                output = await self.call_llm_tool(llm_tool, budget)
+                turn_budget -= len(output.encode())
+                # one entry per call, several calls to the same server/tool in a turn must not overwrite each other
+                results[f'{index}:{llm_tool.server}/{llm_tool.tool}'] = output
             return str(results)
         else:
             logging.info('Not a tool calling LLM response')
@@ -133,7 +239,8 @@ class BotClient:
             # logging.info("No short memory directory found.")
             return
         
-        files = os.listdir(SHORT_MEMORY_DIR)
+        # skip half written files of the filesystem server
+        files = [f for f in os.listdir(SHORT_MEMORY_DIR) if not f.endswith('.tmp')]
         if not files:
             # logging.info("No conversation summaries found.")
             return
@@ -166,21 +273,65 @@ class BotClient:
             except Exception as e:
                 logging.error(f"Error loading short memory: {e}")
     
+    def resume_conversation(self) -> tuple[str, str | None, list[dict]] | None:
+        """
+        Offer to continue the latest journaled conversation.
+        Returns its journal directory, its recap and the replayed tail of its messages.
+        """
+        journal_dir = latest_conversation(JOURNAL_DIR)
+        if journal_dir is None:
+            return None
+        resume = input("\nResume last conversation?[yn]")
+        if resume.lower() != 'y':
+            return None
+        try:
+            recap = load_recap(journal_dir)
+            tail = load_tail(journal_dir, RESUME_MAX_TOKENS)
+        except Exception as e:
+            logging.error(f"Error resuming conversation {journal_dir}: {e}")
+            return None
+        for message in tail:
+            logging.info(f"\n{message['role']}: {message['content']}")
+        return journal_dir, recap, tail
+
+    def add_message(self, messages: list[dict], message: dict):
+        messages.append(message)
+        if self.journal:
+            self.journal.append(message)
+
     async def talk(self):
         try:
             if not self._initialized:
                 raise RuntimeError('Call initialize() first.')
             
             
-            recap = self.load_short_memory()
-            if recap:
-                self._prompt2llm += f"\n\nRecap: {recap}"
-                
+            # system prompt and tool catalog stay byte-identical across sessions so the
+            # provider's prefix cache applies, anything per session(recap) goes after them
             messages = [{
                 'role': "system",
                 'content': self._prompt2llm
             }]
             logging.info(f'\nsystem: {self._prompt2llm}')
+            # the system prompt is rebuilt every session, only the conversation after it is journaled
+            resumed = self.resume_conversation()
+            if resumed:
+                journal_dir, recap, tail = resumed
+                self.journal = Journal(journal_dir, JOURNAL_COMPACT_EVERY, JOURNAL_KEEP_TOKENS, JOURNAL_MAX_CONVERSATIONS)
+            else:
+                tail = []
+                recap = self.load_short_memory()
+                self.journal = Journal.new(JOURNAL_DIR, JOURNAL_COMPACT_EVERY, JOURNAL_KEEP_TOKENS, JOURNAL_MAX_CONVERSATIONS)
+                if recap:
+                    self.journal.save_recap(recap)
+            self.journal.start()
+
+            # the recap is journaled apart from the messages, so resume replays it however long the conversation got
+            if recap:
+                messages.append({
+                    'role': 'system',
+                    'content': f'Recap: {recap}',
+                })
+            messages.extend(tail)
 
             while True:
                 try:
@@ -188,14 +339,14 @@ class BotClient:
                     if new_msg.lower() in ["quit", "exit"]:
                         logging.info("\nExiting...")
                         break
-                    messages.append({
+                    self.add_message(messages, {
                         'role': 'user',
                         'content': new_msg,
                     })
                     
                     llm_answer = await self.llm.chat(messages)
                     logging.info(f'\nassistant: {llm_answer}')
-                    messages.append({
+                    self.add_message(messages, {
                             'role': 'assistant',
                             'content': llm_answer,
                         })
@@ -203,14 +354,14 @@ class BotClient:
                     processed_llm_answer = await self.handle_llm_response(llm_answer)
                     if llm_answer != processed_llm_answer:
                         logging.info(f'\nsystem: {processed_llm_answer}')
-                        messages.append({
+                        self.add_message(messages, {
                             'role': 'system',
                             'content': processed_llm_answer,
                         })
                         
                         final_llm_answer = await self.llm.chat(messages)
                         logging.info(f'\nassistant: {final_llm_answer}')
-                        messages.append({
+                        self.add_message(messages, {
                             'role': 'assistant',
                             'content': final_llm_answer,
                         })
@@ -1,18 +1,39 @@
+from __future__ import annotations
+
 import os
 import json
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, TYPE_CHECKING
 
 from pydantic import BaseModel
-from mcp.types import Tool
-
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(filename)s - %(message)s"
-)
+if TYPE_CHECKING:
+    from mcp.types import Tool
 
 _SERVER_CONFIG = 'server_config.json'
 SHORT_MEMORY_DIR = os.path.join(os.environ['HOME'], '.bot1d', 'storage', 'short-memory')
+# size budget of tool outputs sent back to LLM, the rest is reachable through the expand tool
+TOOL_OUTPUT_MAX_BYTES = int(os.environ.get('BOT1D_TOOL_OUTPUT_MAX_BYTES', 4096))
+TURN_OUTPUT_MAX_BYTES = int(os.environ.get('BOT1D_TURN_OUTPUT_MAX_BYTES', 8192))
+# a call left with less than this is skipped, a truncation marker alone takes ~150 bytes
+MIN_TOOL_OUTPUT_BYTES = 256
+# max follow-up tool calls started speculatively per turn, 0 turns prefetch off
+PREFETCH_MAX_CALLS = int(os.environ.get('BOT1D_PREFETCH_MAX_CALLS', 2))
+LLM_TEMPERATURE = float(os.environ.get('BOT1D_LLM_TEMPERATURE', 0.7))
+# local LLM completion cache, by default only used when temperature is 0
+COMPLETION_CACHE_DIR = os.path.join(os.environ['HOME'], '.bot1d', 'cache', 'completions')
+COMPLETION_CACHE_MAX_ENTRIES = int(os.environ.get('BOT1D_CACHE_MAX_ENTRIES', 1000))
+COMPLETION_CACHE_MAX_BYTES = int(os.environ.get('BOT1D_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+COMPLETION_CACHE_NONZERO_TEMPERATURE = os.environ.get('BOT1D_CACHE_NONZERO_TEMPERATURE') == '1'
+# append-only journal of every conversation, replayed on resume without LLM calls
+JOURNAL_DIR = os.path.join(os.environ['HOME'], '.bot1d', 'storage', 'journal')
+JOURNAL_COMPACT_EVERY = int(os.environ.get('BOT1D_JOURNAL_COMPACT_EVERY', 200))
+JOURNAL_KEEP_TOKENS = int(os.environ.get('BOT1D_JOURNAL_KEEP_TOKENS', 16384))
+RESUME_MAX_TOKENS = int(os.environ.get('BOT1D_RESUME_MAX_TOKENS', 4096))
+# older conversations are removed from the journal, least recently used first
+JOURNAL_MAX_CONVERSATIONS = int(os.environ.get('BOT1D_JOURNAL_MAX_CONVERSATIONS', 50))
+# cold start budget checked by `python -m bot1d.startup bench`
+STARTUP_BUDGET_MS = float(os.environ.get('BOT1D_STARTUP_BUDGET_MS', 800))
 
 class ServerConfig(BaseModel):
     name: str
@@ -0,0 +1,281 @@
+import os
+import re
+import json
+import mmap
+import time
+import queue
+import struct
+import shutil
+import logging
+import threading
+from typing import Any
+
+# record = 4 bytes big-endian length + json message
+_HEADER = struct.Struct('>I')
+_CLOSE = object()
+_SNAPSHOT = 'snapshot.json'
+# full tool outputs behind truncation markers, so expand still works after a resume
+_OUTPUTS = 'outputs'
+# recap the conversation started with, kept out of the log so compaction and tail selection never drop it
+_RECAP = 'recap.json'
+# refs the client puts in truncation markers, out-<session id>-<count>
+_REF = re.compile(r'out-[0-9a-f]+-[0-9]+')
+
+
+def estimate_tokens(message: dict[str, Any]) -> int:
+    """rough token count, ~4 characters per token"""
+    return len(str(message.get('content', ''))) // 4 + 1
+
+def select_tail(messages: list[dict[str, Any]], max_tokens: int) -> list[dict[str, Any]]:
+    """Latest messages within max_tokens, starting at a user message so no exchange is cut in half."""
+    total, start = 0, len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        total += estimate_tokens(messages[i])
+        if total > max_tokens:
+            break
+        start = i
+    while start < len(messages) and messages[start]['role'] != 'user':
+        start += 1
+    return messages[start:]
+
+def _log_path(journal_dir: str, gen: int) -> str:
+    return os.path.join(journal_dir, f'journal-{gen}.log')
+
+def _load_snapshot(journal_dir: str) -> tuple[int, list[dict[str, Any]]]:
+    """(generation of the live journal file, messages compacted before it)"""
+    path = os.path.join(journal_dir, _SNAPSHOT)
+    if not os.path.isfile(path):
+        return 0, []
+    with open(path, 'r') as f:
+        snapshot = json.load(f)
+    return snapshot['gen'], snapshot['messages']
+
+def _record_offsets(mm: mmap.mmap) -> tuple[list[int], int]:
+    """offsets of the complete records and the end of the last one"""
+    offsets, pos = [], 0
+    while pos + _HEADER.size <= len(mm):
+        (size,) = _HEADER.unpack_from(mm, pos)
+        if pos + _HEADER.size + size > len(mm):
+            break
+        offsets.append(pos)
+        pos += _HEADER.size + size
+    return offsets, pos
+
+def _read_log(path: str, max_tokens: int | None = None) -> tuple[list[dict[str, Any]], bool]:
+    """
+    Messages of a journal file, decoded from the end until max_tokens is used up.
+    Only record headers are touched for the skipped part, through mmap.
+    Returns the messages and whether the whole file was read.
+    A torn record at the end (crash while writing) is ignored.
+    """
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return [], True
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        offsets, _ = _record_offsets(mm)
+        messages, total = [], 0
+        for pos in reversed(offsets):
+            (size,) = _HEADER.unpack_from(mm, pos)
+            message = json.loads(mm[pos + _HEADER.size:pos + _HEADER.size + size])
+            messages.append(message)
+            total += estimate_tokens(message)
+            if max_tokens is not None and total > max_tokens:
+                break
+        complete = len(messages) == len(offsets) and (max_tokens is None or total <= max_tokens)
+        return messages[::-1], complete
+
+def load_tail(journal_dir: str, max_tokens: int) -> list[dict[str, Any]]:
+    """Replay the latest messages of a conversation within max_tokens, no LLM call needed."""
+    gen, snapshot = _load_snapshot(journal_dir)
+    messages, complete = _read_log(_log_path(journal_dir, gen), max_tokens)
+    if complete:
+        messages = snapshot + messages
+    return select_tail(messages, max_tokens)
+
+def load_output(journal_dir: str, ref: str) -> str | None:
+    """Full tool output saved under ref, None if there is none."""
+    if os.path.basename(ref) != ref or ref.startswith('.'):
+        return None
+    path = os.path.join(journal_dir, _OUTPUTS, ref)
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'r') as f:
+        return f.read()
+
+def load_recap(journal_dir: str) -> str | None:
+    """Recap the conversation started with, None if there is none."""
+    path = os.path.join(journal_dir, _RECAP)
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)['recap']
+
+def _conversations(base_dir: str) -> list[os.DirEntry]:
+    """journal directories, most recently used first. The writer touches its directory on start."""
+    if not os.path.isdir(base_dir):
+        return []
+    convs = [conv for conv in os.scandir(base_dir) if conv.is_dir()]
+    convs.sort(key=lambda conv: conv.stat().st_mtime, reverse=True)
+    return convs
+
+def latest_conversation(base_dir: str) -> str | None:
+    """Journal directory used most recently, None if there is none."""
+    convs = _conversations(base_dir)
+    return convs[0].path if convs else None
+
+def prune_conversations(base_dir: str, max_conversations: int, current: str):
+    """Remove the least recently used journal directories beyond max_conversations, never the current one."""
+    kept = 1
+    for conv in _conversations(base_dir):
+        if os.path.abspath(conv.path) == os.path.abspath(current):
+            continue
+        if kept < max_conversations:
+            kept += 1
+            continue
+        logging.debug(f'Removing old conversation journal {conv.path}')
+        shutil.rmtree(conv.path, ignore_errors=True)
+
+
+class Journal:
+    """
+    Append-only journal of one conversation.
+    1. append() only queues the message, a writer thread writes length-prefixed records
+       so the turn loop never waits on disk (not even while blocked in input())
+    2. save_output() queues a full tool output the same way, kept next to the journal for expand
+    3. save_recap() queues the recap, it is stored apart from the messages and replayed on resume
+    4. every `compact_every` records the writer compacts the journal:
+       the latest messages within `keep_tokens` go to snapshot.json, a new journal file starts
+       and outputs no kept message refers to are removed
+    5. on start the writer removes the least recently used conversations beyond `max_conversations`
+    """
+    def __init__(self, journal_dir: str, compact_every: int, keep_tokens: int, max_conversations: int) -> None:
+        self.journal_dir = journal_dir
+        self.compact_every = compact_every
+        self.keep_tokens = keep_tokens
+        self.max_conversations = max_conversations
+        self._gen, _ = _load_snapshot(journal_dir)
+        self._since_compact = 0
+        # outputs written since the last compaction, their marker messages may not be journaled yet
+        self._recent_outputs: set[str] = set()
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='bot1d-journal')
+
+    @classmethod
+    def new(cls, base_dir: str, compact_every: int, keep_tokens: int, max_conversations: int) -> 'Journal':
+        return cls(os.path.join(base_dir, str(time.time())), compact_every, keep_tokens, max_conversations)
+
+    def start(self):
+        self._thread.start()
+
+    def append(self, message: dict[str, Any]):
+        self._queue.put(('message', message))
+
+    def save_output(self, ref: str, text: str):
+        self._queue.put(('output', ref, text))
+
+    def save_recap(self, recap: str):
+        self._queue.put(('recap', recap))
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join()
+
+    def _repair(self):
+        """cut a torn record left by a crash, appending after it would hide every later record"""
+        path = _log_path(self.journal_dir, self._gen)
+        if not os.path.isfile(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, 'r+b') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                _, end = _record_offsets(mm)
+                torn = end < len(mm)
+            if torn:
+                logging.warning(f'Dropping torn record at the end of {path}')
+                f.truncate(end)
+
+    def _run(self):
+        try:
+            self._repair()
+            if os.path.isdir(self.journal_dir):
+                # mark a resumed conversation as the latest one
+                os.utime(self.journal_dir)
+            prune_conversations(os.path.dirname(self.journal_dir), self.max_conversations, self.journal_dir)
+        except Exception as err:
+            logging.error(f'Failed to prepare conversation journal {self.journal_dir}, err: {str(err)}')
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [item for item in batch if item is not _CLOSE]
+            try:
+                for _, recap in (item for item in records if item[0] == 'recap'):
+                    self._write_recap(recap)
+                for _, ref, text in (item for item in records if item[0] == 'output'):
+                    self._write_output(ref, text)
+                self._write([item[1] for item in records if item[0] == 'message'])
+                if self._since_compact >= self.compact_every:
+                    self.compact()
+            except Exception as err:
+                logging.error(f'Failed to write conversation journal {self.journal_dir}, err: {str(err)}')
+            if len(records) != len(batch):
+                return
+
+    def _write_output(self, ref: str, text: str):
+        os.makedirs(os.path.join(self.journal_dir, _OUTPUTS), exist_ok=True)
+        with open(os.path.join(self.journal_dir, _OUTPUTS, ref), 'w') as f:
+            f.write(text)
+        self._recent_outputs.add(ref)
+
+    def _write_recap(self, recap: str):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        path = os.path.join(self.journal_dir, _RECAP)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'recap': recap}, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+    def _write(self, messages: list[dict[str, Any]]):
+        if not messages:
+            return
+        os.makedirs(self.journal_dir, exist_ok=True)
+        data = b''
+        for message in messages:
+            record = json.dumps(message, ensure_ascii=False).encode()
+            data += _HEADER.pack(len(record)) + record
+        with open(_log_path(self.journal_dir, self._gen), 'ab') as f:
+            f.write(data)
+        self._since_compact += len(messages)
+
+    def compact(self):
+        """
+        Snapshot the latest messages, switch to a new journal file and remove outputs no kept message refers to.
+        The snapshot names the journal generation it is followed by, so a crash
+        between the two steps never replays a message twice.
+        """
+        _, snapshot = _load_snapshot(self.journal_dir)
+        messages, _ = _read_log(_log_path(self.journal_dir, self._gen))
+        kept = select_tail(snapshot + messages, self.keep_tokens)
+        path = os.path.join(self.journal_dir, _SNAPSHOT)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'gen': self._gen + 1, 'messages': kept}, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+        old_log = _log_path(self.journal_dir, self._gen)
+        self._gen += 1
+        self._since_compact = 0
+        os.remove(old_log)
+        self._prune_outputs(kept)
+        logging.debug(f'Compacted journal {self.journal_dir} to {len(kept)} messages')
+
+    def _prune_outputs(self, kept: list[dict[str, Any]]):
+        outputs_dir = os.path.join(self.journal_dir, _OUTPUTS)
+        if not os.path.isdir(outputs_dir):
+            return
+        refs = set(self._recent_outputs)
+        for message in kept:
+            refs.update(_REF.findall(str(message.get('content', ''))))
+        self._recent_outputs.clear()
+        for ent in os.scandir(outputs_dir):
+            if ent.name not in refs:
+                os.remove(ent.path)
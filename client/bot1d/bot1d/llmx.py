@@ -2,13 +2,19 @@ import logging
 from typing import List
 import re
 
-import httpx
 import asyncio
 
+from bot1d.cache import CompletionCache, canonical_key
 
-logging.basicConfig(
-        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(filename)s - %(message)s"
-)
+# httpx module, imported on the first request to LLM so startup and local cache hits don't pay for it
+_httpx = None
+
+def _load_httpx():
+    global _httpx
+    if _httpx is None:
+        import httpx
+        _httpx = httpx
+    return _httpx
 
 def extract_json_from_think(text: str) -> str:
     """
@@ -23,19 +29,37 @@ def extract_json_from_think(text: str) -> str:
 class LLMx:
     """groqcloud API doc: https://console.groq.com/docs/api-reference#chat"""
     CHAT_URL = 'https://api.groq.com/openai/v1/chat/completions'
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, temperature: float = 0.7, cache: CompletionCache | None = None,
+                 cache_nonzero_temperature: bool = False):
         self._api_key = api_key
+        self.temperature = temperature
+        # a cached answer replays the same sample, only wanted for deterministic sessions unless asked for
+        self.cache = cache if cache and (temperature == 0 or cache_nonzero_temperature) else None
+        # prompt tokens cached by the provider vs. computed again, and tokens saved by the local cache
+        self.usage = {'prompt_tokens': 0, 'cached_prompt_tokens': 0, 'local_cache_hits': 0, 'local_cache_tokens': 0}
         self._request_header = {
             'Content-Type': 'application/json',
             "Authorization": f"Bearer {self._api_key}",
         }
-        self.client = httpx.AsyncClient(
-            headers=self._request_header,
-            timeout=30.0
-        )
+        # created on the first request, see _get_client
+        self.client = None
+
+    def _get_client(self):
+        if self.client is None:
+            self.client = _load_httpx().AsyncClient(
+                headers=self._request_header,
+                timeout=30.0
+            )
+        return self.client
     
+    def report(self) -> str:
+        uncached = self.usage['prompt_tokens'] - self.usage['cached_prompt_tokens']
+        return (f"prompt tokens cached/uncached {self.usage['cached_prompt_tokens']}/{uncached}, "
+                f"local cache hits {self.usage['local_cache_hits']} saving {self.usage['local_cache_tokens']} tokens")
+
     async def cleanup(self):
-        if not self.client.is_closed:
+        logging.info(f'LLM usage: {self.report()}')
+        if self.client is not None and not self.client.is_closed:
             await self.client.aclose()
 
     async def __aenter__(self):
@@ -47,7 +71,6 @@ class LLMx:
         await self.cleanup()
 
     async def chat(self, messages: List[dict]) -> str:
-
         payload = {
             "model": "qwen-qwq-32b",
             # "model": 'llama-3.1-8b-instant',
@@ -55,19 +78,40 @@ class LLMx:
             # What sampling temperature to use, between 0 and 2. 
             # Higher values like 0.8 will make the output more random, 
             # while lower values like 0.2 will make it more focused and deterministic.
-            "temperature": 0.7,
+            "temperature": self.temperature,
             "max_completion_tokens": 4096,
             "stream": False,
             "stop": None,
         }
+        key = canonical_key(payload) if self.cache else None
+        if self.cache:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached:
+                self.usage['local_cache_hits'] += 1
+                self.usage['local_cache_tokens'] += cached['total_tokens']
+                logging.info(f"LLM response from local cache, saved total_tokens {cached['total_tokens']}")
+                return extract_json_from_think(cached['content'])
+        httpx = _load_httpx()
+        client = self._get_client()
         retry = 3
         for i in range(retry):
             try:
-                response = await self.client.post(self.CHAT_URL, json=payload)
+                response = await client.post(self.CHAT_URL, json=payload)
                 response.raise_for_status()
                 data = response.json()
-                logging.info(f"LLM response usage: prompt_tokens/total_tokens {data['usage']['prompt_tokens']}/{data['usage']['total_tokens']}")
+                usage = data['usage']
+                cached_tokens = (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0)
+                self.usage['prompt_tokens'] += usage['prompt_tokens']
+                self.usage['cached_prompt_tokens'] += cached_tokens
+                logging.info(f"LLM response usage: prompt_tokens/cached_tokens/total_tokens "
+                             f"{usage['prompt_tokens']}/{cached_tokens}/{usage['total_tokens']}")
                 content = data['choices'][0]['message']['content']
+                if self.cache:
+                    # a failed cache write must not throw away a completion already paid for
+                    try:
+                        await asyncio.to_thread(self.cache.put, key, {'content': content, 'total_tokens': usage['total_tokens']})
+                    except Exception as err:
+                        logging.warning(f'Failed to cache LLM completion, err: {str(err)}')
                 return extract_json_from_think(content)
             except httpx.HTTPError as err:
                 logging.error(f'{i+1} time request to LLM chat failed, error {str(err)}')
@@ -0,0 +1,136 @@
+import json
+import logging
+from typing import Any, Callable, NamedTuple
+
+import asyncio
+
+from bot1d.server import Server
+
+
+class PrefetchRule(NamedTuple):
+    source_params: frozenset[str] # params the source tool must take, a bare name like 'search' is used by many servers
+    follow_up: str # tool LLM is expected to call next
+    warm: str # tool warming the follow-up into a private cache of the server
+    discard: str # tool dropping a warmed result nobody claimed
+    match_args: tuple[str, ...] # args a follow-up call is matched on
+    build: Callable[[dict], list[dict[str, Any]]] # warm tool args from the source tool output
+
+
+def _pdf_urls(output: dict) -> list[dict[str, Any]]:
+    """arxiv search -> pdf links of the returned papers, best results first"""
+    return [{'url': paper['pdf']} for paper in output.get('papers', []) if paper.get('pdf')]
+
+
+# source tool -> rule of its likely follow-up
+PREFETCH_RULES: dict[str, PrefetchRule] = {
+    'search': PrefetchRule(frozenset({'query', 'max_result', 'fields'}), 'download_pdf_url', 'prefetch_pdf_url',
+                           'discard_prefetched_pdf', ('url',), _pdf_urls),
+}
+# tools only the prefetcher calls, hidden from LLM
+PREFETCH_ONLY_TOOLS = {tool for rule in PREFETCH_RULES.values() for tool in (rule.warm, rule.discard)}
+
+
+class Prefetcher:
+    """
+    Speculatively warm the likely next tool calls in background while LLM writes its answer.
+    1. after a tool returns, look up PREFETCH_RULES for its follow-up tool,
+       the rule applies only if the source server's tool takes the rule's source params
+    2. call the warm tool of the follow-up, at most `budget` calls per turn.
+       Warm tools only fill a private cache of the server, nothing user visible is created
+    3. if LLM asks for a warmed follow-up, wait for the warm call and then run the real call,
+       which the server serves from its cache
+    4. warmed results nobody claimed are discarded on cleanup and counted as wasted work
+    """
+    def __init__(self, servers: dict[str, Server], tool_params: dict[str, dict[str, set[str]]], budget: int) -> None:
+        self.servers = servers
+        self._tool_params = tool_params
+        self.budget = budget
+        self._turn_budget = budget
+        # (server, follow-up tool, *match args) -> (rule, warm args, warm task)
+        self._warm: dict[tuple, tuple[PrefetchRule, dict[str, Any], asyncio.Task]] = {}
+        self.started = 0
+        self.hits = 0
+
+    def new_turn(self) -> None:
+        self._turn_budget = self.budget
+
+    def _find_server(self, tools: tuple[str, ...]) -> str | None:
+        for server_name, server_tools in self._tool_params.items():
+            if all(tool in server_tools for tool in tools):
+                return server_name
+        return None
+
+    @staticmethod
+    def _key(server: str, rule: PrefetchRule, arguments: dict[str, Any]) -> tuple:
+        return (server, rule.follow_up) + tuple(str(arguments.get(arg)) for arg in rule.match_args)
+
+    def schedule(self, source_server: str, tool: str, output: str) -> None:
+        """Warm the follow-up calls of `source_server`/`tool` based on its output."""
+        if tool not in PREFETCH_RULES or self._turn_budget <= 0:
+            return
+        rule = PREFETCH_RULES[tool]
+        if not rule.source_params <= self._tool_params.get(source_server, {}).get(tool, set()):
+            return
+        server_name = self._find_server((rule.follow_up, rule.warm, rule.discard))
+        if server_name is None:
+            return
+        try:
+            output_json = json.loads(output)
+        except json.JSONDecodeError:
+            return
+        if not isinstance(output_json, dict):
+            return
+        for arguments in rule.build(output_json):
+            if self._turn_budget <= 0:
+                break
+            key = self._key(server_name, rule, arguments)
+            if key in self._warm:
+                continue
+            logging.info(f'Prefetching {server_name}/{rule.warm} {arguments}')
+            task = asyncio.create_task(self.servers[server_name].call_tool(rule.warm, arguments))
+            self._warm[key] = (rule, arguments, task)
+            self._turn_budget -= 1
+            self.started += 1
+
+    async def claim(self, server: str, tool: str, arguments: dict[str, Any]) -> None:
+        """
+        Wait for the warm call matching this follow-up, if there is one, so the real call hits the server cache.
+        Only a warm call that succeeded counts as a hit.
+        """
+        rule = next((r for r in PREFETCH_RULES.values() if r.follow_up == tool), None)
+        if rule is None:
+            return
+        warmed = self._warm.pop(self._key(server, rule, arguments), None)
+        if warmed is None:
+            return
+        try:
+            result = await warmed[2]
+        except Exception as err:
+            logging.warning(f'Prefetch of {server}/{tool} failed, err: {str(err)}')
+            return
+        if result is not None and not result.isError:
+            self.hits += 1
+
+    def report(self) -> str:
+        hit_rate = self.hits / self.started if self.started else 0.0
+        return (f'prefetch started/hits/wasted {self.started}/{self.hits}/{len(self._warm)}, '
+                f'hit rate {hit_rate:.0%}')
+
+    async def cleanup(self):
+        """
+        Discard warmed results nobody claimed without waiting for running warm calls.
+        A cancelled warm call may still finish on the server, its file is left to the server side expiry.
+        """
+        logging.info(f'Prefetch stats: {self.report()}')
+        finished = []
+        for (server_name, *_), (rule, arguments, task) in self._warm.items():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled() and task.exception() is None:
+                finished.append((server_name, rule, arguments))
+        for server_name, rule, arguments in finished:
+            try:
+                await self.servers[server_name].call_tool(rule.discard, arguments)
+            except Exception as err:
+                logging.warning(f'Failed to discard prefetched {server_name}/{rule.warm} {arguments}, err: {str(err)}')
+        self._warm.clear()
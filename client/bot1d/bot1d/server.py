@@ -1,17 +1,22 @@
-from typing import Any
+from __future__ import annotations
+
+from typing import Any, TYPE_CHECKING
 import logging
 from contextlib import AsyncExitStack
 
 import asyncio
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from mcp.types import ListToolsResult, Tool
 
 from bot1d.config import ServerConfig
 
-logging.basicConfig(
-        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(filename)s - %(message)s"
-)
+if TYPE_CHECKING:
+    from mcp import ClientSession
+    from mcp.types import ListToolsResult, Tool
+
+def import_mcp():
+    """mcp is the slowest import of the client, only loaded once a server is started"""
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+    return ClientSession, StdioServerParameters, stdio_client
 
 class Server:
     """Interface to interact with MCP servers"""
@@ -39,6 +44,7 @@ class Server:
         3. init clientsession context manager
         4. let clientsession initialize connection with server
         """
+        ClientSession, StdioServerParameters, stdio_client = import_mcp()
         server_params = StdioServerParameters(
             command=self._config.command,
             args=self._config.args,
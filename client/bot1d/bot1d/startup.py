@@ -0,0 +1,88 @@
+"""
+Startup profiling of the client.
+    python -m bot1d.startup profile [--top N]   slowest imports of a cold start, by cumulative time
+    python -m bot1d.startup bench [--runs N] [--budget-ms MS]   fails when median cold start is over budget
+A cold start is the start up path of main.py till the first prompt, without spawning MCP server processes.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+from bot1d.config import STARTUP_BUDGET_MS
+
+# what `python main.py` does before the first prompt, short of spawning the server processes:
+# imports, config, LLM client and chatbot set up, and the mcp import Server.initialize pays when servers are configured
+STARTUP_CODE = """
+import main
+from bot1d.config import load_config
+from bot1d.llmx import LLMx
+from bot1d.client import BotClient
+from bot1d.server import Server, import_mcp
+servers = [Server(config) for config in load_config()]
+if servers:
+    import_mcp()
+BotClient(LLMx('startup-bench'), servers)
+"""
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_cold(*python_args: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [_PROJECT_DIR, os.environ.get('PYTHONPATH')])))
+    # cwd as for `python main.py`, server_config.json is looked up relative to it
+    return subprocess.run([sys.executable, *python_args, '-c', STARTUP_CODE],
+                          cwd=_PROJECT_DIR, env=env, capture_output=True, text=True, check=True)
+
+
+def profile(top: int) -> list[tuple[int, str]]:
+    """(cumulative us, module) of the slowest imports"""
+    result = _run_cold('-X', 'importtime')
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.removeprefix('import time:').split('|')
+        modules.append((int(cumulative), name.strip()))
+    modules.sort(reverse=True)
+    return modules[:top]
+
+
+def bench(runs: int) -> list[float]:
+    """wall time in ms of each cold start, interpreter startup included"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _run_cold()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m bot1d.startup', description='client startup profiling')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    profile_parser = sub.add_parser('profile', help='show the slowest imports')
+    profile_parser.add_argument('--top', type=int, default=20)
+    bench_parser = sub.add_parser('bench', help='check cold start time against a budget')
+    bench_parser.add_argument('--runs', type=int, default=5)
+    bench_parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'profile':
+        for cumulative, name in profile(args.top):
+            print(f'{cumulative / 1000:9.1f} ms  {name}')
+        return 0
+
+    timings = bench(args.runs)
+    median = statistics.median(timings)
+    print(f'cold start median {median:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms, '
+          f'budget {args.budget_ms:.1f} ms')
+    if median > args.budget_ms:
+        print(f'FAIL: cold start is {median - args.budget_ms:.1f} ms over budget', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,27 @@
 import os
 import asyncio
+import logging
 
-from bot1d.config import load_config
+from bot1d.config import (load_config, LLM_TEMPERATURE, COMPLETION_CACHE_DIR, COMPLETION_CACHE_MAX_ENTRIES,
+                          COMPLETION_CACHE_MAX_BYTES, COMPLETION_CACHE_NONZERO_TEMPERATURE)
 from bot1d.server import Server
 from bot1d.llmx import LLMx
+from bot1d.cache import CompletionCache
 from bot1d.client import BotClient
 
+logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(filename)s - %(message)s"
+)
+
 async def main():
     server_configs = load_config()
     servers = [Server(config) for config in server_configs]
     llm_apikey = os.environ['LLM_API_KEY']
-    llm = LLMx(llm_apikey)
+    cache = None
+    # skip indexing the cache directory when the cache would not be used anyway
+    if LLM_TEMPERATURE == 0 or COMPLETION_CACHE_NONZERO_TEMPERATURE:
+        cache = CompletionCache(COMPLETION_CACHE_DIR, COMPLETION_CACHE_MAX_ENTRIES, COMPLETION_CACHE_MAX_BYTES)
+    llm = LLMx(llm_apikey, LLM_TEMPERATURE, cache, COMPLETION_CACHE_NONZERO_TEMPERATURE)
     chatbot = BotClient(llm, servers)
     await chatbot.initialize()
     await chatbot.talk()
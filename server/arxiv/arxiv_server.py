@@ -1,3 +1,5 @@
+import json
+
 from arxiv_httpx import ArxivX
 from mcp.server.fastmcp import FastMCP
 
@@ -5,9 +7,46 @@ mcp = FastMCP('ArxivMCP')
 
 arxiv = ArxivX()
 
+PAPER_FIELDS = ['title', 'authors', 'link', 'summary', 'published', 'pdf']
+
+
+# Same as fit_to_bytes in server/weather/weather.py, keep the two copies in sync.
+# Every server is a standalone uv project run from its own directory, there is no shared module to import.
+def fit_to_bytes(items: list[dict], max_bytes: int | None, trim_field: str, key: str) -> str:
+    """
+    JSON of {key: kept items, 'omitted': count} within max_bytes, wrapper included.
+    Leading items are kept whole, the first one that overflows gets its trim_field shortened instead, if that is enough.
+    Returns '' when not even the empty wrapper fits.
+    """
+    def render(kept: list[dict]) -> str:
+        return json.dumps({key: kept, 'omitted': len(items) - len(kept)}, ensure_ascii=False)
+
+    def fits(text: str) -> bool:
+        return max_bytes is None or len(text.encode()) <= max_bytes
+
+    kept = []
+    for item in items:
+        if fits(render(kept + [item])):
+            kept.append(item)
+            continue
+        text = item.get(trim_field)
+        if isinstance(text, str):
+            data = text.encode()
+            over = len(render(kept + [item]).encode()) - max_bytes + len('...')
+            while over < len(data):
+                trimmed = {**item, trim_field: data[:len(data) - over].decode(errors='ignore') + '...'}
+                size = len(render(kept + [trimmed]).encode())
+                if size <= max_bytes:
+                    kept.append(trimmed)
+                    break
+                over += size - max_bytes
+        break
+    result = render(kept)
+    return result if fits(result) else ''
+
 
 @mcp.tool()
-async def search(query: str, max_result: int = 5):
+async def search(query: str, max_result: int = 5, fields: list[str] | None = None, max_bytes: int | None = None) -> str:
     """
     search paper on arxiv by title or id. Must provide either title or id.
     Args:
@@ -15,8 +54,14 @@ async def search(query: str, max_result: int = 5):
         If only title is given, query is ti:<title>. If only id is given, query is id:<id>.
         If both are given, query is ti:<title>+AND+id:<id>.
         max_result: max return numbers. Default is 5
+        fields: paper fields to return, any of title, authors, link, summary, published, pdf. Default is all.
+        max_bytes: size limit of the returned JSON. Papers over the limit are omitted, summary is cut first.
     """
 
+    unknown = [f for f in fields or [] if f not in PAPER_FIELDS]
+    if unknown:
+        return f'Unknown fields {unknown}. Allowed fields: {PAPER_FIELDS}'
+
     papers = await arxiv.search(query, max_result)
     results = []
     for ent in papers:
@@ -31,7 +76,9 @@ async def search(query: str, max_result: int = 5):
             if link['type'] == 'application/pdf':
                 results[-1]['pdf'] = link['href']
                 break
-    return results
+    fields = fields or PAPER_FIELDS
+    results = [{f: paper[f] for f in fields if f in paper} for paper in results]
+    return fit_to_bytes(results, max_bytes, 'summary', 'papers')
 
 
 if __name__ == "__main__":
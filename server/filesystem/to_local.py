@@ -1,26 +1,110 @@
 import time
 import os
+import json
+import asyncio
+import logging
 
 from mcp.server.fastmcp import FastMCP, Context
 
 storage_dir = os.path.join(os.environ['HOME'], '.bot1d', 'storage')
 short_memory_dir = os.path.join(storage_dir, 'short-memory')
+# none: temp file + rename. fsync: + fsync of every file and the directory.
+# batch: + fsync of every temp file, then all renames and a single directory fsync per tool call.
+DURABILITY_POLICIES = ('none', 'fsync', 'batch')
+durability = os.environ.get('BOT1D_FS_DURABILITY', 'batch')
+if durability not in DURABILITY_POLICIES:
+    logging.warning(f'Unknown BOT1D_FS_DURABILITY {durability!r}, expected one of {DURABILITY_POLICIES}, using batch')
+    durability = 'batch'
 
 mcp = FastMCP('self-filesystem')
 
 
-def write_to_file(content: any, file_dir: str, file_name: str=None) -> str:
+def fsync_path(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def write_to_file(content: any, file_dir: str, file_name: str=None, sync: bool=None) -> str:
     """
-    Write to a local file under storage path. Return file path.
+    Write to a local file under storage path through a temp file and rename. Return file name.
+    sync defaults to the durability policy(a single file is its own batch).
     """
-    if not os.path.isdir(file_dir):
-        os.makedirs(file_dir)
+    os.makedirs(file_dir, exist_ok=True)
+    sync = durability != 'none' if sync is None else sync
     file_name = file_name if file_name else str(time.time())
     full_path = os.path.join(file_dir, file_name)
-    with open(full_path, 'w') as f:
+    tmp_path = full_path + '.tmp'
+    with open(tmp_path, 'w') as f:
         f.write(content)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, full_path)
+    if sync:
+        fsync_path(file_dir)
     return file_name
 
+def write_many(contents: list[str], file_dir: str) -> list[str]:
+    """
+    Write several files, return their names.
+    batch policy: every temp file is written and fsynced before any rename, so a renamed file
+    is never left empty by a crash, then the directory is fsynced once for all renames.
+    """
+    stamp = time.time()
+    file_names = [f'{stamp}-{i}' for i in range(len(contents))]
+    if durability != 'batch':
+        return [write_to_file(content, file_dir, file_name) for content, file_name in zip(contents, file_names)]
+    os.makedirs(file_dir, exist_ok=True)
+    for content, file_name in zip(contents, file_names):
+        with open(os.path.join(file_dir, file_name + '.tmp'), 'w') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+    for file_name in file_names:
+        os.replace(os.path.join(file_dir, file_name + '.tmp'), os.path.join(file_dir, file_name))
+    if file_names:
+        fsync_path(file_dir)
+    return file_names
+
+def memory_path(file_name: str) -> str | None:
+    """Full path of a short memory file, None if file_name points outside short memory directory."""
+    full_path = os.path.abspath(os.path.join(short_memory_dir, file_name))
+    if os.path.dirname(full_path) != os.path.abspath(short_memory_dir):
+        return None
+    return full_path
+
+def delete_many(file_names: list[str], older_than: float | None = None) -> dict[str, list[str]]:
+    result = {'deleted': [], 'missing': []}
+    if older_than is not None:
+        file_names = list(file_names) + [f['name'] for f in list_with_metadata(short_memory_dir)
+                                         if f['mtime'] < older_than and f['name'] not in file_names]
+    for file_name in file_names:
+        full_path = memory_path(file_name)
+        if full_path is None or not os.path.isfile(full_path):
+            result['missing'].append(file_name)
+            continue
+        os.remove(full_path)
+        result['deleted'].append(file_name)
+    if result['deleted'] and durability != 'none':
+        fsync_path(short_memory_dir)
+    return result
+
+def list_with_metadata(directory: str, older_than: float | None = None) -> list[dict]:
+    """name, size and modification time of files under directory, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    files = []
+    for ent in os.scandir(directory):
+        if not ent.is_file() or ent.name.endswith('.tmp'):
+            continue
+        stat = ent.stat()
+        if older_than is None or stat.st_mtime < older_than:
+            files.append({'name': ent.name, 'size': stat.st_size, 'mtime': stat.st_mtime})
+    files.sort(key=lambda f: f['mtime'], reverse=True)
+    return files
+
 def list_directory(directory: str) -> list:
     """
     List all files under the given directory.
@@ -47,12 +131,28 @@ async def save_short_memory(memory: str, ctx: Context) -> str:
         The filename where the summary was saved
     """
     try:
-        file_path = write_to_file(memory, short_memory_dir)
+        file_path = await asyncio.to_thread(write_to_file, memory, short_memory_dir)
         return f'Successfully saved short memory to file: {file_path}'
     except Exception as err:
-        ctx.info(err)
+        await ctx.info(str(err))
         return f'Failed to create short memory: {err}'
 
+@mcp.tool()
+async def save_short_memories(memories: list[str], ctx: Context) -> str:
+    """
+    Save many short memories at once, one file each. Same rules as save_short_memory for each memory.
+    Args:
+        memories: The memories to save
+    Returns:
+        The filenames where the memories were saved
+    """
+    try:
+        file_names = await asyncio.to_thread(write_many, memories, short_memory_dir)
+        return f'Successfully saved {len(file_names)} short memories to files: {file_names}'
+    except Exception as err:
+        await ctx.info(str(err))
+        return f'Failed to create short memories: {err}'
+
 @mcp.tool()
 async def delete_short_memory(file_name: str) -> str:
     """
@@ -60,25 +160,53 @@ async def delete_short_memory(file_name: str) -> str:
     Args:
       file_name: short memory filename.
     """
+    full_path = os.path.join(short_memory_dir, file_name)
     try:
-        full_path = os.path.join(short_memory_dir, file_name)
-        if not os.path.isfile(full_path):
+        result = await asyncio.to_thread(delete_many, [file_name])
+        if not result['deleted']:
             return f'File {full_path} does not exist under short memory directoy.'
-        os.remove(full_path)
         return f'File {full_path} deleted.'
     except Exception as err:
         return f'Failed to delete file {full_path}, error: {err}.'
 
+@mcp.tool()
+async def delete_short_memories(file_names: list[str] | None = None, older_than: float | None = None) -> dict | str:
+    """
+    Delete many short memory files at once. Only files under short memory path are allowed.
+    Args:
+      file_names: short memory filenames.
+      older_than: also delete every short memory modified before this unix time, no listing needed.
+    Returns:
+        deleted filenames and missing filenames
+    """
+    try:
+        return await asyncio.to_thread(delete_many, file_names or [], older_than)
+    except Exception as err:
+        return f'Failed to delete files, error: {err}.'
 
-# don't want to send LLM too many info, changed this part to pure logic in MCP client.
-# @mcp.tool()
-# async def list_short_memory() -> list:
-#     """
-#     Retrieve a list of all saved conversation summary files from the local storage.
-#     Returns:
-#         A list of filenames containing conversation summaries
-#     """
-#     return list_directory(short_memory_dir)
+# listing for bulk maintenance only, the recap at chat start is still pure logic in MCP client
+# so LLM is not sent the list on every chat.
+@mcp.tool()
+async def list_short_memories(limit: int = 100, offset: int = 0, older_than: float | None = None,
+                              names_only: bool = False) -> str:
+    """
+    List saved short memory files with metadata, newest first. Use it to pick files for bulk deletion.
+    Args:
+        limit: max files to return. Default is 100.
+        offset: files to skip, pass next_offset of the previous page.
+        older_than: only files modified before this unix time.
+        names_only: return file names only, much smaller for thousands of files.
+    Returns:
+        files with name, size in bytes and mtime(unix time), total matching files and next_offset(null on last page)
+    """
+    files = await asyncio.to_thread(list_with_metadata, short_memory_dir, older_than)
+    page = files[max(offset, 0):max(offset, 0) + max(limit, 0)]
+    next_offset = max(offset, 0) + len(page)
+    return json.dumps({
+        'files': [f['name'] for f in page] if names_only else page,
+        'total': len(files),
+        'next_offset': next_offset if next_offset < len(files) else None,
+    })
 
 
 if __name__ == '__main__':
@@ -1,15 +1,42 @@
 import os
+import time
+import hashlib
 import httpx
 from mcp.server.fastmcp import FastMCP, Context
 
 GENAI_PDF_DIR = os.path.join(os.environ['HOME'], 'genai', 'pdf')
 os.makedirs(GENAI_PDF_DIR, exist_ok=True)
+# speculative downloads of clients, moved to the requested filename once claimed by download_pdf_url
+PREFETCH_DIR = os.path.join(GENAI_PDF_DIR, '.prefetch')
+PREFETCH_TTL = int(os.environ.get('PDF_PREFETCH_TTL', 3600))
 
 mcp = FastMCP('pdf')
 
 # TODO: better error handling, maybe ctx(Context)??
 
 
+def prefetch_path(url: str) -> str:
+    return os.path.join(PREFETCH_DIR, hashlib.sha256(url.encode()).hexdigest() + '.pdf')
+
+def expire_prefetched():
+    """remove prefetched pdfs nobody claimed within PREFETCH_TTL"""
+    if not os.path.isdir(PREFETCH_DIR):
+        return
+    now = time.time()
+    for ent in os.scandir(PREFETCH_DIR):
+        if now - ent.stat().st_mtime > PREFETCH_TTL:
+            os.remove(ent.path)
+
+async def fetch_pdf(url: str, path: str):
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url)
+        response.raise_for_status()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(response.content)
+    os.replace(tmp_path, path)
+
+
 @mcp.tool()
 async def download_pdf_url(url: str, filename: str) -> str:
     """
@@ -22,15 +49,51 @@ async def download_pdf_url(url: str, filename: str) -> str:
         pdf filename
     """
 
+    filename = os.path.join(GENAI_PDF_DIR, filename)
+    cached = prefetch_path(url)
+    if os.path.isfile(cached):
+        os.replace(cached, filename)
+        return filename
+
     async with httpx.AsyncClient() as client:
         response = await client.get(url)
         response.raise_for_status()
 
-        filename = os.path.join(GENAI_PDF_DIR, filename)
         with open(filename, 'wb') as f:
             f.write(response.content)
     return filename
 
+@mcp.tool()
+async def prefetch_pdf_url(url: str) -> str:
+    """
+    For MCP clients only, not for LLM. Download a remote pdf into the private prefetch cache,
+    a later download_pdf_url of the same url then takes it from there without network.
+    Unclaimed pdfs expire after PDF_PREFETCH_TTL seconds.
+    Args:
+        url: pdf url. No auth supported currently.
+    Return:
+        cached pdf path
+    """
+    expire_prefetched()
+    os.makedirs(PREFETCH_DIR, exist_ok=True)
+    path = prefetch_path(url)
+    if not os.path.isfile(path):
+        await fetch_pdf(url, path)
+    return path
+
+@mcp.tool()
+async def discard_prefetched_pdf(url: str) -> str:
+    """
+    For MCP clients only, not for LLM. Remove the prefetched pdf of url, if any.
+    Args:
+        url: pdf url given to prefetch_pdf_url.
+    """
+    path = prefetch_path(url)
+    if os.path.isfile(path):
+        os.remove(path)
+        return f'Discarded {path}'
+    return f'Nothing prefetched for {url}'
+
 """
 read_pdf won't work when client is Claude Desktop. Reasons answered by Claude:
 1. We're accessing the raw PDF file from your local filesystem
@@ -1,4 +1,5 @@
 from typing import Any
+import json
 import httpx
 from mcp.server.fastmcp import FastMCP
 import sys
@@ -7,6 +8,11 @@ mcp = FastMCP("weather")
 
 NWS_API_BASE = "https://api.weather.gov"
 USER_AGENT = "weather-app/1.0"
+ALERT_FIELDS = ['event', 'areaDesc', 'severity', 'description', 'instruction']
+FORECAST_FIELDS = ['name', 'temperature', 'temperatureUnit', 'windSpeed', 'windDirection', 'shortForecast', 'detailedForecast']
+# long texts only when asked for through fields
+ALERT_DEFAULT_FIELDS = ['event', 'areaDesc', 'severity']
+FORECAST_DEFAULT_FIELDS = ['name', 'temperature', 'temperatureUnit', 'windSpeed', 'windDirection', 'shortForecast']
 
 async def make_nws_request(url: str) -> dict[str, Any] | None:
     """"request nws website for weather data"""
@@ -19,22 +25,63 @@ async def make_nws_request(url: str) -> dict[str, Any] | None:
         except Exception:
             return None
 
-def format_alert(feature: dict) -> str:
-    props = feature["properties"]
-    return f"""
-Event: {props.get('event', 'Unknown')}
-Area: {props.get('areaDesc', 'Unknown')}
-Severity: {props.get('severity', 'Unknown')}
-Description: {props.get('description', 'No description available')}
-Instructions: {props.get('instruction', 'No specific instructions provided')}
-"""
+def unknown_fields(fields: list[str] | None, allowed: list[str]) -> str | None:
+    """error message for requested fields that don't exist, None if all are known"""
+    unknown = [f for f in fields or [] if f not in allowed]
+    if unknown:
+        return f'Unknown fields {unknown}. Allowed fields: {allowed}'
+    return None
+
+def project(item: dict, fields: list[str] | None, default: list[str]) -> dict:
+    """keep only the requested fields of item, default fields if none requested"""
+    return {f: item.get(f) for f in fields or default}
+
+# Same as fit_to_bytes in server/arxiv/arxiv_server.py, keep the two copies in sync.
+# Every server is a standalone uv project run from its own directory, there is no shared module to import.
+def fit_to_bytes(items: list[dict], max_bytes: int | None, trim_field: str, key: str) -> str:
+    """
+    JSON of {key: kept items, 'omitted': count} within max_bytes, wrapper included.
+    Leading items are kept whole, the first one that overflows gets its trim_field shortened instead, if that is enough.
+    Returns '' when not even the empty wrapper fits.
+    """
+    def render(kept: list[dict]) -> str:
+        return json.dumps({key: kept, 'omitted': len(items) - len(kept)}, ensure_ascii=False)
+
+    def fits(text: str) -> bool:
+        return max_bytes is None or len(text.encode()) <= max_bytes
+
+    kept = []
+    for item in items:
+        if fits(render(kept + [item])):
+            kept.append(item)
+            continue
+        text = item.get(trim_field)
+        if isinstance(text, str):
+            data = text.encode()
+            over = len(render(kept + [item]).encode()) - max_bytes + len('...')
+            while over < len(data):
+                trimmed = {**item, trim_field: data[:len(data) - over].decode(errors='ignore') + '...'}
+                size = len(render(kept + [trimmed]).encode())
+                if size <= max_bytes:
+                    kept.append(trimmed)
+                    break
+                over += size - max_bytes
+        break
+    result = render(kept)
+    return result if fits(result) else ''
 
 @mcp.tool()
-async def get_alerts(state: str) -> str:
+async def get_alerts(state: str, fields: list[str] | None = None, max_bytes: int | None = None) -> str:
     """Get weather alerts for a US state.
     Args:
         state: Two-Letter US state code (e.g. CA,NY)
+        fields: alert fields to return, any of event, areaDesc, severity, description, instruction.
+        Default is event, areaDesc, severity.
+        max_bytes: size limit of the returned JSON. Alerts over the limit are omitted, description is cut first.
     """    
+    error = unknown_fields(fields, ALERT_FIELDS)
+    if error:
+        return error
     url = f"{NWS_API_BASE}/alerts/active/area/{state}"
     data = await make_nws_request(url)
 
@@ -42,16 +89,22 @@ async def get_alerts(state: str) -> str:
         return "Unable to fetch alerts or no alerts found"
     if not data['features']:
         return "No active alerts for this state."
-    alerts = [format_alert(feature) for feature in data["features"]]
-    return "\n---\n".join(alerts)
+    alerts = [project(feature["properties"], fields, ALERT_DEFAULT_FIELDS) for feature in data["features"]]
+    return fit_to_bytes(alerts, max_bytes, 'description', 'alerts')
 
 @mcp.tool()
-async def get_forecast(latitude: float, longitude: float) -> str:
+async def get_forecast(latitude: float, longitude: float, fields: list[str] | None = None, max_bytes: int | None = None) -> str:
     """Get wweather forecast for a location.
     Args:
          latitude: Latitude of the location
          longitude: Longitude of the location
+         fields: period fields to return, any of name, temperature, temperatureUnit, windSpeed,
+         windDirection, shortForecast, detailedForecast. Default is all but detailedForecast.
+         max_bytes: size limit of the returned JSON. Periods over the limit are omitted, detailedForecast is cut first.
     """
+    error = unknown_fields(fields, FORECAST_FIELDS)
+    if error:
+        return error
     # First get the forecast grid endpoint
     points_url = f"{NWS_API_BASE}/points/{latitude},{longitude}"
     points_data = await make_nws_request(points_url)
@@ -66,19 +119,9 @@ async def get_forecast(latitude: float, longitude: float) -> str:
     if not forecast_data:
         return "Unable to fetch detailed forecast."
 
-    # Format the periods into a readable forecast
     periods = forecast_data["properties"]["periods"]
-    forecasts = []
-    for period in periods[:5]:  # Only show next 5 periods
-        forecast = f"""
-{period['name']}:
-Temperature: {period['temperature']}°{period['temperatureUnit']}
-Wind: {period['windSpeed']} {period['windDirection']}
-Forecast: {period['detailedForecast']}
-"""
-        forecasts.append(forecast)
-
-    return "\n---\n".join(forecasts)
+    forecasts = [project(period, fields, FORECAST_DEFAULT_FIELDS) for period in periods[:5]]  # Only show next 5 periods
+    return fit_to_bytes(forecasts, max_bytes, 'detailedForecast', 'periods')
 
 if __name__ == "__main__":
    print('server starting...')